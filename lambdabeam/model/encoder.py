@@ -160,17 +160,16 @@ class Signature(nn.Module):
     super(Signature, self).__init__()
     self.tuple_length = deepcoder_propsig.SIGNATURE_TUPLE_LENGTH
     self.embed_length = 2
-    self.frac_applicable_embed = nn.Embedding(12, self.embed_length)
-    self.frac_tf_embed = nn.Embedding(12, self.embed_length)
+    num_buckets = deepcoder_propsig.NUM_QUANTIZED_BUCKETS
+    self.frac_applicable_embed = nn.Embedding(num_buckets, self.embed_length)
+    self.frac_tf_embed = nn.Embedding(num_buckets, self.embed_length)
     self.len_signature = len_signature
 
-  def quantize(self, sig):
-    return torch.where(sig < 1e-8, 0, (sig * 10).floor().long() + 1)
-
   def forward(self, list_signatures, device):
+    # Signatures are already quantized with deepcoder_propsig.quantize_signature
+    # so they are copied to the device as uint8.
     # shape: [num signatures, self.len_signature, self.tuple_length]
-    signatures = torch.FloatTensor(list_signatures).to(device)
-    signatures = self.quantize(signatures).long()
+    signatures = torch.from_numpy(np.stack(list_signatures)).to(device).long()
     # shape: [num signatures, self.len_signature, self.tuple_length, self.embed_length]
     embed = torch.cat([
         self.frac_applicable_embed(signatures[:, :, 0:1]),
@@ -199,6 +198,7 @@ class LambdaSigIOEncoder(Signature):
       for input_name, input_value in inputs_dict.items():
         cur_input.append(value_module.InputVariable(input_value, name=input_name))
       signature = deepcoder_propsig.property_signature_io_examples(cur_input, value_module.OutputValue(outputs), fixed_length=True)
+      signature = deepcoder_propsig.quantize_signature(signature)
       list_signatures.append(signature)
 
     feat_embed = super(LambdaSigIOEncoder, self).forward(list_signatures, device)
@@ -471,6 +471,7 @@ class LambdaSigValueEncoder(nn.Module):
     for v in all_values:
       if not isinstance(v, value_module.FreeVariable):
         signature = deepcoder_propsig.property_signature_value(v, output_values, fixed_length=True)
+        signature = deepcoder_propsig.quantize_signature(signature)
         list_normal_signatures.append((v.num_free_variables, signature))
     all_embed = self.forward_with_signatures(all_values, device, list_normal_signatures)
     if need_signatures:
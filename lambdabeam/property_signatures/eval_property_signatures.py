@@ -23,7 +23,7 @@ def analyze_distances(values, sigs):
   num_avoidable_same_signature = 0
   num_printed = collections.defaultdict(int)
   for value, sig in zip(values, sigs):
-    key = str(sig)
+    key = sig.tobytes()
     if key in sig_to_value:
       num_same_signature += 1
       value_type = value.type
@@ -102,7 +102,7 @@ def evaluate_property_signatures(value_set, output_value, profile=False):
       # `IsEven(0)` -> [True] is treated as the same functionality as
       # `IsEven(in1)` -> [True, True] if there are 2 examples, both of which
       # have in1 being even.
-      io_pairs_per_example *= output_value.num_examples
+      io_pairs_per_example = io_pairs_per_example * output_value.num_examples
     key = str(io_pairs_per_example)
     lambda_functionality_dict[key].append((v, sig))
 
@@ -48,17 +48,37 @@ When dealing with multiple I/O examples, reduce across examples.
 If desired, the property signatures can have fixed length, by adding a lot of
 padding for the properties that don't apply (which would be omitted for variable
 length signatures).
+
+The functions above are implemented in pure Python and serve as the reference
+for variable-length signatures. Fixed-length signatures are written into int8
+buffers, and the int and list cases (which dominate DeepCoder) are handled by
+kernels that must agree exactly with the reference. The kernels are compiled
+with Numba, and if Numba is not installed the reference is used instead.
 """
 # Booleans are a kind of int according to isinstance(). Use type() instead.
 # pylint: disable=unidiomatic-typecheck
 
+import functools
 import itertools
-from typing import Any, List, Optional, Tuple, Type, Union
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+import numpy as np
 
 from lambdabeam.dsl import deepcoder_operations
 from lambdabeam.dsl import domains
 from lambdabeam.dsl import value as value_module
 
+try:
+  import numba  # pylint: disable=g-import-not-at-top
+  _njit = numba.njit(cache=True)
+except ImportError:
+  # Without Numba the kernels below are not used (see _KERNELS_ENABLED), since
+  # as plain Python they are slower than the reference implementation.
+  numba = None
+  _njit = lambda fn: fn
+
+_KERNELS_ENABLED = numba is not None
+
 DEFAULT_VALUES = {
     bool: False,
     int: 0,
@@ -89,24 +109,52 @@ VALUES_TO_TRY = {
     },
 }
 
+# Argument lists that run_lambda() passes to lambdas of each arity, and the
+# types of those arguments. These are shared across all lambdas (and stored in
+# their `lambda_exec_results`), so they must not be modified.
+_INPUTS_TO_TRY_BY_ARITY = {
+    arity: [[i] for i in to_try] if arity == 1 else to_try
+    for arity, to_try in VALUES_TO_TRY[int].items()
+}
+_LAMBDA_INPUT_TYPES = tuple(VALUES_TO_TRY)
+
 # The maximum number of inputs for a lambda Value or an I/O example, if
 # fixed-length signatures are desired. The inputs will be padded or truncated to
 # match this number.
 FIXED_NUM_IO_INPUTS = 3
 FIXED_NUM_LAMBDA_INPUTS = 2
 
-SignatureTupleType = Tuple[float, float]
+# A reduced signature is a float32 array of shape
+# [signature length, SIGNATURE_TUPLE_LENGTH], where each row holds
+# (fraction of examples where the property is applicable, fraction of those
+# where it is True).
 _REDUCED_PADDING = (0.0, 0.5)
 SIGNATURE_TUPLE_LENGTH = len(_REDUCED_PADDING)
 
+# Single-example signatures hold bools, or -1 where a property is not
+# applicable. Fixed-length signatures are int8 arrays using 1 for True and 0 for
+# False.
 SinglePropertyType = Union[bool, int]
+SingleExampleSignatureType = Union[List[SinglePropertyType], np.ndarray]
 
 
-def _type_property(x) -> List[bool]:
-  """Returns a one-hot List[bool] representation of type(x)."""
-  type_x = type(x)
-  is_lambda = getattr(x, 'num_free_variables', 0) > 0
-  return [is_lambda, type_x is bool, type_x is int, type_x is list, x is None]
+# One-hot (is lambda, is bool, is int, is list, is None) type properties. They
+# are shared between calls and must not be modified.
+_LAMBDA_TYPE_PROPERTY = (True, False, False, False, False)
+_TYPE_PROPERTY_BY_TYPE = {
+    bool: (False, True, False, False, False),
+    int: (False, False, True, False, False),
+    list: (False, False, False, True, False),
+    type(None): (False, False, False, False, True),
+}
+_OTHER_TYPE_PROPERTY = (False, False, False, False, False)
+
+
+def _type_property(x) -> Tuple[bool, ...]:
+  """Returns a one-hot Tuple[bool] representation of type(x)."""
+  if getattr(x, 'num_free_variables', 0) > 0:
+    return _LAMBDA_TYPE_PROPERTY
+  return _TYPE_PROPERTY_BY_TYPE.get(type(x), _OTHER_TYPE_PROPERTY)
 
 
 def _basic_properties(x) -> List[bool]:
@@ -137,13 +185,20 @@ def _basic_properties(x) -> List[bool]:
         abs_x < 100,
     ]
   elif type_x is list:
-    sorted_x = list(sorted(x))
-    reverse_sorted_x = list(reversed(sorted_x))
-    num_unique = len(set(x))
+    # Equivalent to x == sorted(x) and x == sorted(x, reverse=True).
+    is_sorted = True
+    is_reverse_sorted = True
+    for i in range(1, len(x)):
+      if x[i] < x[i - 1]:
+        is_sorted = False
+      elif x[i] > x[i - 1]:
+        is_reverse_sorted = False
+      if not (is_sorted or is_reverse_sorted):
+        break
     return [
-        x == sorted_x,
-        x == reverse_sorted_x,
-        num_unique == len(x),
+        is_sorted,
+        is_reverse_sorted,
+        len(set(x)) == len(x),
     ]
   else:
     raise NotImplementedError(f'x has unhandled type {type(x)}')
@@ -172,7 +227,10 @@ def _relevant(x) -> List[Any]:
 
 
 def _basic_properties_of_relevant(x) -> List[Any]:
-  return sum((_basic_properties(r) for r in _relevant(x)), [])
+  result = []
+  for r in _relevant(x):
+    result.extend(_basic_properties(r))
+  return result
 
 _BASIC_PROPERTIES_OF_RELEVANT_LENGTH_BY_TYPE = {
     t: len(_basic_properties_of_relevant(DEFAULT_VALUES[t]))
@@ -180,18 +238,36 @@ _BASIC_PROPERTIES_OF_RELEVANT_LENGTH_BY_TYPE = {
 }
 
 
-def _basic_signature(x, fixed_length) -> List[SinglePropertyType]:
+def _basic_signature(x, fixed_length) -> SingleExampleSignatureType:
   """Returns a signature representing a single concrete object."""
   if not fixed_length:
-    return _type_property(x) + _basic_properties_of_relevant(x)
+    return [*_type_property(x), *_basic_properties_of_relevant(x)]
   else:
-    result = list(_type_property(x))
     type_x = type(x)
-    for t in DEFAULT_VALUES:
-      result.extend(
-          _basic_properties_of_relevant(x) if type_x is t
-          else [-1] * _BASIC_PROPERTIES_OF_RELEVANT_LENGTH_BY_TYPE[t])
-    return result
+    return _fixed_basic_signature(type_x,
+                                  tuple(x) if type_x is list else x)
+
+
+def _unhashable(type_x: Type[Any], key: Any) -> Any:
+  """Returns the object for a cache key, where lists are keyed as tuples."""
+  return list(key) if type_x is list else key
+
+
+# The same small objects (e.g., lambda outputs) are seen over and over during
+# search. The type is part of the cache key because True == 1. Cached arrays are
+# shared, so they are made read-only.
+@functools.lru_cache(maxsize=4096)
+def _fixed_basic_signature(type_x: Type[Any], key: Any) -> np.ndarray:
+  """Returns a memoized fixed-length basic signature."""
+  x = _unhashable(type_x, key)
+  result = np.full(_BASIC_SIGNATURE_LENGTH, -1, dtype=np.int8)
+  result[:_TYPE_PROPERTY_LENGTH] = _type_property(x)
+  offset = _BASIC_SIGNATURE_OFFSET_BY_TYPE.get(type_x)
+  # Other types (e.g., lambdas) have no basic properties, only padding.
+  if offset is not None:
+    _fill_basic_properties_of_relevant(x, result, offset)
+  result.flags.writeable = False
+  return result
 
 
 def _compare_same_type(x, y) -> List[bool]:
@@ -240,30 +316,40 @@ def _compare_same_type(x, y) -> List[bool]:
     raise NotImplementedError(f'x has unhandled type {type(x)}')
 
 
-def _compare(x, y, fixed_length, x_types=None) -> List[SinglePropertyType]:
+def _compare(x, y, fixed_length, x_types=None) -> SingleExampleSignatureType:
   """Compares two concrete (non-lambda) objects of any type."""
   type_x = type(x)
   type_y = type(y)
   if not fixed_length:
     if type_x == type_y:
       return _compare_same_type(x, y)
-    return (sum((_compare_same_type(r, y)
-                 for r in _relevant(x) + _basic_properties(x)
-                 if type(r) == type_y), []) +
-            sum((_compare_same_type(x, r)
-                 for r in _relevant(y) + _basic_properties(y)
-                 if type_x == type(r)), []))
-  else:
     result = []
-    if x_types is None:
-      type_pairs = itertools.product(DEFAULT_VALUES, repeat=2)
-    else:
-      type_pairs = itertools.product(x_types, DEFAULT_VALUES)
-    for (type_1, type_2) in type_pairs:
-      result.extend(_compare(x, y, fixed_length=False)
-                    if (type_x, type_y) == (type_1, type_2)
-                    else [-1] * _COMPARE_LENGTH_BY_TYPES[(type_1, type_2)])
+    for r in _relevant(x) + _basic_properties(x):
+      if type(r) == type_y:
+        result.extend(_compare_same_type(r, y))
+    for r in _relevant(y) + _basic_properties(y):
+      if type_x == type(r):
+        result.extend(_compare_same_type(x, r))
     return result
+  else:
+    return _fixed_compare(type_x, tuple(x) if type_x is list else x,
+                          type_y, tuple(y) if type_y is list else y,
+                          None if x_types is None else tuple(x_types))
+
+
+@functools.lru_cache(maxsize=4096)
+def _fixed_compare(
+    type_x: Type[Any], key_x: Any, type_y: Type[Any], key_y: Any,
+    x_types: Optional[Tuple[Type[Any], ...]]) -> np.ndarray:
+  """Returns a memoized fixed-length comparison."""
+  length, offsets = _compare_layout(x_types)
+  result = np.full(length, -1, dtype=np.int8)
+  offset = offsets.get((type_x, type_y))
+  if offset is not None:
+    _fill_compare(_unhashable(type_x, key_x), _unhashable(type_y, key_y),
+                  result, offset)
+  result.flags.writeable = False
+  return result
 
 
 _COMPARE_LENGTH_BY_TYPES = {
@@ -273,89 +359,539 @@ _COMPARE_LENGTH_BY_TYPES = {
 }
 
 
+@functools.lru_cache(maxsize=None)
+def _compare_layout(
+    x_types: Optional[Tuple[Type[Any], ...]]
+) -> Tuple[int, Dict[Tuple[Type[Any], Type[Any]], int]]:
+  """Returns the length and per-type-pair offsets of a fixed-length compare."""
+  if x_types is None:
+    type_pairs = itertools.product(DEFAULT_VALUES, repeat=2)
+  else:
+    type_pairs = itertools.product(x_types, DEFAULT_VALUES)
+  offsets = {}
+  length = 0
+  for type_pair in type_pairs:
+    offsets[type_pair] = length
+    length += _COMPARE_LENGTH_BY_TYPES[type_pair]
+  return length, offsets
+
+
+_TYPE_PROPERTY_LENGTH = len(_type_property(None))
+_BASIC_SIGNATURE_OFFSET_BY_TYPE = {}
+_BASIC_SIGNATURE_LENGTH = _TYPE_PROPERTY_LENGTH
+for _t in DEFAULT_VALUES:
+  _BASIC_SIGNATURE_OFFSET_BY_TYPE[_t] = _BASIC_SIGNATURE_LENGTH
+  _BASIC_SIGNATURE_LENGTH += _BASIC_PROPERTIES_OF_RELEVANT_LENGTH_BY_TYPE[_t]
+
+_NUM_INT_PROPERTIES = _BASIC_PROPERTIES_OF_RELEVANT_LENGTH_BY_TYPE[int]
+_NUM_LIST_PROPERTIES = len(_basic_properties(DEFAULT_VALUES[list]))
+_NUM_INT_COMPARISONS = _COMPARE_LENGTH_BY_TYPES[(int, int)]
+# The int objects in _relevant(x) for a list x: len, num unique, max, min,
+# max - min, sum, first, and last.
+_NUM_LIST_AGGREGATES = 8
+
+
+@_njit
+def _fill_int_properties(x, out, offset):
+  """Writes _basic_properties(x) for an int x into out[offset:]."""
+  abs_x = abs(x)
+  out[offset] = x == -1
+  out[offset + 1] = x == 0
+  out[offset + 2] = x == 1
+  out[offset + 3] = x == 2
+  out[offset + 4] = x > 0
+  out[offset + 5] = x < 0
+  out[offset + 6] = x % 2 == 0
+  out[offset + 7] = x % 3 == 0
+  out[offset + 8] = x % 3 == 1
+  out[offset + 9] = abs_x < 5
+  out[offset + 10] = abs_x < 10
+  out[offset + 11] = abs_x < 20
+  out[offset + 12] = abs_x < 35
+  out[offset + 13] = abs_x < 50
+  out[offset + 14] = abs_x < 75
+  out[offset + 15] = abs_x < 100
+
+
+@_njit
+def _list_summary(x):
+  """Returns the _basic_properties(x) and the aggregates of a list x.
+
+  The aggregates are the int objects in _relevant(x), and follow the
+  _NUM_LIST_PROPERTIES basic properties in the returned int64 array.
+  """
+  summary = np.zeros(_NUM_LIST_PROPERTIES + _NUM_LIST_AGGREGATES,
+                     dtype=np.int64)
+  is_sorted = True
+  is_reverse_sorted = True
+  for i in range(1, len(x)):
+    if x[i] < x[i - 1]:
+      is_sorted = False
+    elif x[i] > x[i - 1]:
+      is_reverse_sorted = False
+    if not (is_sorted or is_reverse_sorted):
+      break
+  summary[0] = is_sorted
+  summary[1] = is_reverse_sorted
+  aggregates = summary[_NUM_LIST_PROPERTIES:]
+  aggregates[0] = len(x)
+  if len(x) == 0:
+    # _relevant() replaces an empty list with DEFAULT_VALUES[list], i.e., [0].
+    summary[2] = True
+    aggregates[1] = 1
+    return summary
+  max_x = x.max()
+  min_x = x.min()
+  aggregates[1] = len(np.unique(x))
+  aggregates[2] = max_x
+  aggregates[3] = min_x
+  aggregates[4] = max_x - min_x
+  aggregates[5] = x.sum()
+  aggregates[6] = x[0]
+  aggregates[7] = x[-1]
+  summary[2] = aggregates[1] == len(x)
+  return summary
+
+
+@_njit
+def _fill_list_properties_of_relevant(summary, out, offset):
+  """Writes _basic_properties_of_relevant(x) into out[offset:].
+
+  Args:
+    summary: The _list_summary() of a list x.
+    out: The array to write into.
+    offset: Where to start writing.
+  """
+  for i in range(_NUM_LIST_PROPERTIES):
+    out[offset + i] = summary[i]
+  offset += _NUM_LIST_PROPERTIES
+  for aggregate in summary[_NUM_LIST_PROPERTIES:]:
+    _fill_int_properties(aggregate, out, offset)
+    offset += _NUM_INT_PROPERTIES
+
+
+@_njit
+def _fill_int_comparisons(x, y, out, offset):
+  """Writes _compare_same_type(x, y) for ints x and y into out[offset:]."""
+  abs_diff = abs(x - y)
+  out[offset] = x == y
+  out[offset + 1] = x < y
+  out[offset + 2] = x > y
+  out[offset + 3] = x != 0 and y % x == 0
+  out[offset + 4] = y != 0 and x % y == 0
+  out[offset + 5] = abs_diff < 2
+  out[offset + 6] = abs_diff < 5
+  out[offset + 7] = abs_diff < 10
+  out[offset + 8] = abs_diff < 20
+
+
+@_njit
+def _is_sorted_subset(a, b):
+  """Returns whether sorted unique array a is a subset of sorted unique b."""
+  j = 0
+  for ai in a:
+    while j < len(b) and b[j] < ai:
+      j += 1
+    if j == len(b) or b[j] != ai:
+      return False
+  return True
+
+
+# Bits for the element-wise checks in _fill_list_comparisons(). A pair of
+# elements satisfies exactly the bits in _ELEMENT_MASKS[sign(xi - yi) + 1].
+_ALL_LT = 1
+_ALL_LE = 2
+_ALL_GT = 4
+_ALL_GE = 8
+_ALL_EQ = 16
+_ALL_NE = 32
+_ELEMENT_MASKS = (_ALL_LT | _ALL_LE | _ALL_NE,  # xi < yi
+                  _ALL_LE | _ALL_GE | _ALL_EQ,  # xi == yi
+                  _ALL_GT | _ALL_GE | _ALL_NE)  # xi > yi
+
+
+@_njit
+def _fill_list_comparisons(x_arrays, y_arrays, out, offset):
+  """Writes _compare_same_type(x, y) for lists x and y into out[offset:].
+
+  Args:
+    x_arrays: The list x as an array, and its sorted unique elements.
+    y_arrays: The same for y.
+    out: The array to write into.
+    offset: Where to start writing.
+  """
+  x, unique_x = x_arrays
+  y, unique_y = y_arrays
+  len_x = len(x)
+  len_y = len(y)
+  # All six element-wise checks are ANDed together in one branchless bitmask,
+  # stopping early once every check has failed.
+  mask = _ELEMENT_MASKS[0] | _ELEMENT_MASKS[1] | _ELEMENT_MASKS[2]
+  for i in range(min(len_x, len_y)):
+    mask &= _ELEMENT_MASKS[int(x[i] > y[i]) - int(x[i] < y[i]) + 1]
+    if not mask:
+      break
+  all_eq = (mask & _ALL_EQ) != 0
+  x_subset_y = _is_sorted_subset(unique_x, unique_y)
+  y_subset_x = _is_sorted_subset(unique_y, unique_x)
+  out[offset] = len_x == len_y and all_eq
+  out[offset + 1] = len_x == len_y
+  out[offset + 2] = len_x > len_y
+  out[offset + 3] = len_x < len_y
+  out[offset + 4] = abs(len_x - len_y) < 2
+  out[offset + 5] = (mask & _ALL_LT) != 0
+  out[offset + 6] = (mask & _ALL_LE) != 0
+  out[offset + 7] = (mask & _ALL_GT) != 0
+  out[offset + 8] = (mask & _ALL_GE) != 0
+  out[offset + 9] = all_eq
+  out[offset + 10] = (mask & _ALL_NE) != 0
+  out[offset + 11] = x_subset_y and y_subset_x
+  out[offset + 12] = x_subset_y
+  out[offset + 13] = y_subset_x
+
+
+@_njit
+def _fill_list_int_comparisons(x_summary, y, out, offset):
+  """Writes _compare(x, y) for a list x and an int y into out[offset:].
+
+  The list is given by its _list_summary().
+  """
+  for aggregate in x_summary[_NUM_LIST_PROPERTIES:]:
+    _fill_int_comparisons(aggregate, y, out, offset)
+    offset += _NUM_INT_COMPARISONS
+
+
+@_njit
+def _fill_int_list_comparisons(x, y_summary, out, offset):
+  """Writes _compare(x, y) for an int x and a list y into out[offset:].
+
+  The list is given by its _list_summary().
+  """
+  for aggregate in y_summary[_NUM_LIST_PROPERTIES:]:
+    _fill_int_comparisons(x, aggregate, out, offset)
+    offset += _NUM_INT_COMPARISONS
+
+
+@_njit
+def _fill_int_properties_batch(xs, out, offset):
+  """Writes _basic_properties(xs[e]) into out[e, offset:] for each e."""
+  for e in range(len(xs)):
+    _fill_int_properties(xs[e], out[e], offset)
+
+
+@_njit
+def _fill_int_comparisons_batch(xs, ys, out, offset):
+  """Writes _compare_same_type(xs[e], ys[e]) into out[e, offset:] for each e."""
+  for e in range(len(xs)):
+    _fill_int_comparisons(xs[e], ys[e], out[e], offset)
+
+
+def _as_array(x: List[int]) -> np.ndarray:
+  return np.fromiter(x, dtype=np.int64, count=len(x))
+
+
+def _identity(x: Any) -> Any:
+  return x
+
+
+# The kernels use int64 arithmetic (e.g., sums of list elements and differences
+# of aggregates), which can't overflow if every int is at most this in absolute
+# value. Objects with larger ints use the reference implementation, which has
+# arbitrary precision. DeepCoder values are far smaller, but task I/O isn't
+# checked.
+_MAX_KERNEL_ABS_INT = 2**31
+
+
+def _in_kernel_range(x: Any) -> bool:
+  """Returns whether an int or list of ints is safe to pass to the kernels."""
+  if type(x) is list:
+    return not x or (min(x) >= -_MAX_KERNEL_ABS_INT and
+                     max(x) <= _MAX_KERNEL_ABS_INT)
+  return -_MAX_KERNEL_ABS_INT <= x <= _MAX_KERNEL_ABS_INT
+
+
+# A list is typically compared with many objects, each comparison memoized
+# separately, so what the kernels need from it is memoized too. Cached arrays
+# are read-only.
+@functools.lru_cache(maxsize=4096)
+def _cached_list_summary(key: Tuple[int, ...]) -> np.ndarray:
+  result = _list_summary(_as_array(key))
+  result.flags.writeable = False
+  return result
+
+
+def _list_summary_of(x: List[int]) -> np.ndarray:
+  return _cached_list_summary(tuple(x))
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_list_arrays(key: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+  values = _as_array(key)
+  unique = np.unique(values)
+  values.flags.writeable = False
+  unique.flags.writeable = False
+  return values, unique
+
+
+def _list_arrays_of(x: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+  """Returns a list as an array, and its sorted unique elements."""
+  return _cached_list_arrays(tuple(x))
+
+
+# Maps a type to a kernel writing _basic_properties_of_relevant() for objects of
+# that type, and the function converting the object to the kernel's argument.
+# Types without a kernel use the reference implementation.
+_BASIC_PROPERTIES_KERNEL_BY_TYPE = {
+    int: (_fill_int_properties, _identity),
+    list: (_fill_list_properties_of_relevant, _list_summary_of),
+} if _KERNELS_ENABLED else {}
+
+# Maps a pair of types to a kernel writing _compare() for objects of those
+# types, and the functions converting the objects to the kernel's arguments.
+_COMPARE_KERNEL_BY_TYPES = {
+    (int, int): (_fill_int_comparisons, _identity, _identity),
+    (int, list): (_fill_int_list_comparisons, _identity, _list_summary_of),
+    (list, int): (_fill_list_int_comparisons, _list_summary_of, _identity),
+    (list, list): (_fill_list_comparisons, _list_arrays_of, _list_arrays_of),
+} if _KERNELS_ENABLED else {}
+
+
+def _fill_basic_properties_of_relevant(x, out: np.ndarray, offset: int) -> None:
+  """Writes _basic_properties_of_relevant(x) into out[offset:]."""
+  kernel = _BASIC_PROPERTIES_KERNEL_BY_TYPE.get(type(x))
+  if kernel is not None and _in_kernel_range(x):
+    fill, convert = kernel
+    fill(convert(x), out, offset)
+  else:
+    properties = _basic_properties_of_relevant(x)
+    out[offset:offset + len(properties)] = properties
+
+
+def _fill_compare(x, y, out: np.ndarray, offset: int) -> None:
+  """Writes _compare(x, y, fixed_length=False) into out[offset:]."""
+  kernel = _COMPARE_KERNEL_BY_TYPES.get((type(x), type(y)))
+  if kernel is not None and _in_kernel_range(x) and _in_kernel_range(y):
+    fill, convert_x, convert_y = kernel
+    fill(convert_x(x), convert_y(y), out, offset)
+  else:
+    comparisons = _compare(x, y, fixed_length=False)
+    out[offset:offset + len(comparisons)] = comparisons
+
+
+@functools.lru_cache(maxsize=None)
+def _single_example_length(
+    fixed_num_inputs: int,
+    input_types: Optional[Tuple[Type[Any], ...]],
+    include_input_basic_signatures: bool) -> int:
+  """Returns the length of a fixed-length single-example signature."""
+  length_per_input = _compare_layout(input_types)[0]
+  if include_input_basic_signatures:
+    length_per_input += _BASIC_SIGNATURE_LENGTH
+  return _BASIC_SIGNATURE_LENGTH + fixed_num_inputs * length_per_input
+
+
 def _property_signature_single_example(
     inputs: List[Any],
     output: Any,
     fixed_length: bool = True,
     fixed_num_inputs: int = FIXED_NUM_IO_INPUTS,
-    input_types: Optional[List[Type[Any]]] = None,
-    include_input_basic_signatures: bool = True) -> List[SinglePropertyType]:
+    input_types: Optional[Sequence[Type[Any]]] = None,
+    include_input_basic_signatures: bool = True) -> SingleExampleSignatureType:
   """Returns a property signature for a single I/O example."""
   if not fixed_length:
-    return _basic_signature(output, fixed_length) + sum(
-        (_basic_signature(i, fixed_length) + _compare(i, output, fixed_length,
-                                                      x_types=input_types)
-         for i in inputs), [])
-  else:
-    if len(inputs) > fixed_num_inputs:
-      inputs = inputs[:fixed_num_inputs]
-    result = list(_basic_signature(output, fixed_length))
-    basic_sig_length = len(result)
+    result = _basic_signature(output, fixed_length)
     for i in inputs:
-      if include_input_basic_signatures:
-        result.extend(_basic_signature(i, fixed_length))
+      result.extend(_basic_signature(i, fixed_length))
       result.extend(_compare(i, output, fixed_length, x_types=input_types))
-    if len(inputs) < fixed_num_inputs:
-      assert (len(result) - basic_sig_length) % len(inputs) == 0
-      result.extend([-1] * (
-          (len(result) - basic_sig_length) // len(inputs) *  # Length per input
-          (fixed_num_inputs - len(inputs))))  # Number of inputs to pad
-    return  result
+    return result
+  else:
+    result = np.full(
+        _single_example_length(
+            fixed_num_inputs,
+            None if input_types is None else tuple(input_types),
+            include_input_basic_signatures),
+        -1, dtype=np.int8)
+    # Missing inputs are left as padding.
+    parts = [_basic_signature(output, fixed_length)]
+    for i in inputs[:fixed_num_inputs]:
+      if include_input_basic_signatures:
+        parts.append(_basic_signature(i, fixed_length))
+      parts.append(_compare(i, output, fixed_length, x_types=input_types))
+    signature = np.concatenate(parts)
+    result[:len(signature)] = signature
+    return result
 
 
 def _property_signature_single_object(
     x: Any,
     output: Any,
-    fixed_length: bool = True) -> List[SinglePropertyType]:
+    fixed_length: bool = True) -> SingleExampleSignatureType:
   """Returns a property signature for an object in context of an I/O example."""
-  return _basic_signature(x, fixed_length) + _compare(x, output, fixed_length)
+  if not fixed_length:
+    return _basic_signature(x, fixed_length) + _compare(x, output, fixed_length)
+  else:
+    return np.concatenate([_basic_signature(x, fixed_length),
+                           _compare(x, output, fixed_length)])
 
 
 def _reduce_across_examples(
-    signatures: List[List[SinglePropertyType]]
-) -> List[SignatureTupleType]:
-  """Reduce across examples (frac applicable, frac True)."""
-  # All signatures should have the same length across examples.
+    signatures: Union[np.ndarray, List[List[SinglePropertyType]]]
+) -> np.ndarray:
+  """Reduce across examples (frac applicable, frac True).
+
+  Args:
+    signatures: A [num examples, signature length] int8 array, or a list of
+      equal-length single-example signatures.
+
+  Returns:
+    A float32 array of shape [signature length, SIGNATURE_TUPLE_LENGTH].
+  """
+  signatures = np.asarray(signatures, dtype=np.int8)
   num_examples = len(signatures)
   assert num_examples
-  signature_len = len(signatures[0])
-  assert all(len(sig) == signature_len for sig in signatures)
+  if _KERNELS_ENABLED:
+    return _reduce_rows(signatures)
+  num_true = np.count_nonzero(signatures == 1, axis=0)
+  num_not_none = num_true + np.count_nonzero(signatures == 0, axis=0)
+  result = np.empty((signatures.shape[1], SIGNATURE_TUPLE_LENGTH),
+                    dtype=np.float32)
+  result[:, 0] = num_not_none / num_examples
+  result[:, 1] = np.divide(num_true, num_not_none,
+                           out=np.full(len(num_true), 0.5),
+                           where=num_not_none > 0)
+  return result
 
-  result = []
-  for bools in zip(*signatures):
-    num_true = bools.count(True)
-    num_not_none = num_true + bools.count(False)
-    frac_applicable = num_not_none / num_examples
-    frac_true = num_true / num_not_none if num_not_none else 0.5
-    result.append((frac_applicable, frac_true))
+
+@_njit
+def _reduce_rows(signatures):
+  """Kernel for _reduce_across_examples(), keeping running counts per column."""
+  num_examples, length = signatures.shape
+  num_true = np.zeros(length, dtype=np.int32)
+  num_not_none = np.zeros(length, dtype=np.int32)
+  for e in range(num_examples):
+    row = signatures[e]
+    for j in range(length):
+      if row[j] >= 0:
+        num_not_none[j] += 1
+        num_true[j] += row[j]
+  result = np.empty((length, SIGNATURE_TUPLE_LENGTH), dtype=np.float32)
+  for j in range(length):
+    result[j, 0] = num_not_none[j] / num_examples
+    if num_not_none[j]:
+      result[j, 1] = num_true[j] / num_not_none[j]
+    else:
+      result[j, 1] = 0.5
   return result
 
-  # Alternative numpy implementation, but it's slightly slower because
-  # np.array() is slow.
 
-  # num_examples = len(signatures)
-  # array = np.array(signatures, dtype=np.int8)
-  # num_true = np.sum(array == 1, axis=0)
-  # num_not_none = np.sum(array != -1, axis=0)
-  # frac_applicable = num_not_none / num_examples
-  # frac_true = np.where(num_not_none, num_true / num_not_none, 0.5)
-  # return list(zip(frac_applicable, frac_true))
+def _objects_per_example(value: value_module.Value,
+                         num_examples: int) -> List[Any]:
+  """Returns [value[i] for i in range(num_examples)], without the indexing.
+
+  The result may be value.values itself and must not be modified.
+  """
+  values = value.values
+  if len(values) == 1 and num_examples > 1:
+    # Like Value.__getitem__, a single value is used for every example.
+    return values * num_examples
+  assert len(values) == num_examples, (
+      f'Value has {len(values)} examples, expected {num_examples}')
+  return values
 
 
 def property_signature_io_examples(
     input_values: List[value_module.Value],
     output_value: value_module.Value,
-    fixed_length: bool = True) -> List[SignatureTupleType]:
+    fixed_length: bool = True) -> np.ndarray:
   """Returns a property signature for a set of I/O examples."""
   num_examples = output_value.num_examples
   assert all(i_value.num_examples == num_examples for i_value in input_values)
-  return _reduce_across_examples(
-      [_property_signature_single_example(  # pylint: disable=g-complex-comprehension
-          [i_value[example_index] for i_value in input_values],
-          output_value[example_index],
-          fixed_length=fixed_length,
-          fixed_num_inputs=FIXED_NUM_IO_INPUTS)
-       for example_index in range(num_examples)])
+  # Gather each value's objects across examples once, so that int values can be
+  # handled for all examples at once.
+  outputs = _objects_per_example(output_value, num_examples)
+  if not fixed_length:
+    inputs_per_value = [_objects_per_example(i_value, num_examples)
+                        for i_value in input_values]
+    return _reduce_across_examples(
+        [_property_signature_single_example(  # pylint: disable=g-complex-comprehension
+            [inputs[example_index] for inputs in inputs_per_value],
+            output,
+            fixed_length=fixed_length,
+            fixed_num_inputs=FIXED_NUM_IO_INPUTS)
+         for example_index, output in enumerate(outputs)])
+  signatures = np.full(
+      (num_examples, _single_example_length(FIXED_NUM_IO_INPUTS, None, True)),
+      -1, dtype=np.int8)
+  output_ints = _int_array_or_none(outputs)
+  offset = _fill_basic_signature_column(signatures, 0, outputs, output_ints)
+  for i_value in input_values[:FIXED_NUM_IO_INPUTS]:
+    inputs = _objects_per_example(i_value, num_examples)
+    input_ints = _int_array_or_none(inputs)
+    offset = _fill_basic_signature_column(signatures, offset, inputs,
+                                          input_ints)
+    offset = _fill_compare_column(signatures, offset, inputs, input_ints,
+                                  outputs, output_ints)
+  return _reduce_across_examples(signatures)
+
+
+def _int_array_or_none(objects: List[Any]) -> Optional[np.ndarray]:
+  """Returns the objects as an int64 array if they are all ints.
+
+  Returns None if the batch kernels taking the array are not enabled, or if an
+  int is out of their range.
+  """
+  if (_KERNELS_ENABLED and all(type(x) is int for x in objects) and
+      _in_kernel_range(objects)):
+    return np.array(objects, dtype=np.int64)
+  return None
+
+
+def _fill_basic_signature_column(
+    out: np.ndarray,
+    offset: int,
+    objects: List[Any],
+    ints: Optional[np.ndarray]) -> int:
+  """Writes basic signatures of objects[e] into out[e, offset:] for each e.
+
+  Args:
+    out: A [num examples, signature length] array filled with -1.
+    offset: The column where the basic signatures start.
+    objects: The object for each example.
+    ints: The result of _int_array_or_none(objects).
+
+  Returns:
+    The column where the basic signatures end.
+  """
+  if ints is not None:
+    out[:, offset:offset + _TYPE_PROPERTY_LENGTH] = _type_property(
+        DEFAULT_VALUES[int])
+    _fill_int_properties_batch(ints, out,
+                               offset + _BASIC_SIGNATURE_OFFSET_BY_TYPE[int])
+  else:
+    for row, x in zip(out, objects):
+      row[offset:offset + _BASIC_SIGNATURE_LENGTH] = _basic_signature(
+          x, fixed_length=True)
+  return offset + _BASIC_SIGNATURE_LENGTH
+
+
+def _fill_compare_column(
+    out: np.ndarray,
+    offset: int,
+    xs: List[Any],
+    x_ints: Optional[np.ndarray],
+    ys: List[Any],
+    y_ints: Optional[np.ndarray],
+    x_types: Optional[Tuple[Type[Any], ...]] = None) -> int:
+  """Like _fill_basic_signature_column(), but for _compare(xs[e], ys[e])."""
+  length, offsets = _compare_layout(x_types)
+  if x_ints is not None and y_ints is not None:
+    _fill_int_comparisons_batch(x_ints, y_ints, out,
+                                offset + offsets[(int, int)])
+  else:
+    for row, x, y in zip(out, xs, ys):
+      row[offset:offset + length] = _compare(x, y, fixed_length=True,
+                                             x_types=x_types)
+  return offset + length
 
 IO_EXAMPLES_SIGNATURE_LENGTH = len(property_signature_io_examples(
     [value_module.InputVariable([1, 2], 'in1')],
@@ -366,35 +902,82 @@ IO_EXAMPLES_SIGNATURE_LENGTH = len(property_signature_io_examples(
 def _property_signature_concrete_value(
     value: value_module.Value,
     output_value: value_module.Value,
-    fixed_length: bool = True) -> List[SignatureTupleType]:
+    fixed_length: bool = True) -> np.ndarray:
   """Returns a property signature for a value w.r.t. a set of I/O examples."""
   assert value.num_free_variables == 0
-  return _reduce_across_examples(
-      [_property_signature_single_object(
-          value[i], output_value[i], fixed_length=fixed_length)
-       for i in range(output_value.num_examples)])
+  num_examples = output_value.num_examples
+  xs = _objects_per_example(value, num_examples)
+  targets = _objects_per_example(output_value, num_examples)
+  if not fixed_length:
+    return _reduce_across_examples(
+        [_property_signature_single_object(x, target, fixed_length=fixed_length)
+         for x, target in zip(xs, targets)])
+  signatures = np.empty(
+      (num_examples, _BASIC_SIGNATURE_LENGTH + _compare_layout(None)[0]),
+      dtype=np.int8)
+  for row, x, target in zip(signatures, xs, targets):
+    row[:_BASIC_SIGNATURE_LENGTH] = _basic_signature(x, fixed_length)
+    row[_BASIC_SIGNATURE_LENGTH:] = _compare(x, target, fixed_length)
+  return _reduce_across_examples(signatures)
 
 
 def run_lambda(
     value: value_module.Value,
 ) -> Optional[List[Tuple[List[Any], Any, int]]]:
-  """Runs a lambda on canonical values."""
+  """Runs a lambda on canonical values.
+
+  Lambda Values never change, so the result is cached on the Value as
+  `lambda_exec_results`. Callers must not modify it.
+  """
+  if not hasattr(value, 'lambda_exec_results'):
+    value.lambda_exec_results = _run_lambda_uncached(value)
+  return value.lambda_exec_results
+
+
+def _run_lambda_uncached(
+    value: value_module.Value,
+) -> Optional[List[Tuple[List[Any], Any, int]]]:
+  """Runs a lambda on canonical values, without caching."""
   arity = value.num_free_variables
   assert arity > 0
-  io_with_example_index_list = []
-  to_try = VALUES_TO_TRY[int][arity]
+  lambda_fns = [value[i] for i in range(value.num_examples)]
+  num_examples = len(lambda_fns)
+  inputs_to_try = _INPUTS_TO_TRY_BY_ARITY[arity]
+  # Runs the lambda on each input list, cycling through the examples. The loops
+  # only differ in how the lambda is called, since passing a fixed number of
+  # arguments is faster than `*inputs_list`. If the lambda raises an exception,
+  # it doesn't apply to the inputs, just like a failed apply_single in
+  # Operation.apply, so the input list is skipped.
+  results = []
   if arity == 1:
-    to_try = [[i] for i in to_try]
-  for try_index, inputs_list in enumerate(to_try):
-    example_index = try_index % value.num_examples
-    lambda_fn = value[example_index]
-    try:
-      result = lambda_fn(*inputs_list)
-      if not deepcoder_operations.deepcoder_small_value_filter(result):
-        result = None
-      io_with_example_index_list.append((inputs_list, result, example_index))
-    except:  # pylint: disable=bare-except
-      pass
+    for try_index, inputs_list in enumerate(inputs_to_try):
+      example_index = try_index % num_examples
+      try:
+        result = lambda_fns[example_index](inputs_list[0])
+      except Exception:  # pylint: disable=broad-except
+        continue
+      results.append((inputs_list, result, example_index))
+  elif arity == 2:
+    for try_index, inputs_list in enumerate(inputs_to_try):
+      example_index = try_index % num_examples
+      try:
+        result = lambda_fns[example_index](inputs_list[0], inputs_list[1])
+      except Exception:  # pylint: disable=broad-except
+        continue
+      results.append((inputs_list, result, example_index))
+  else:
+    for try_index, inputs_list in enumerate(inputs_to_try):
+      example_index = try_index % num_examples
+      try:
+        result = lambda_fns[example_index](*inputs_list)
+      except Exception:  # pylint: disable=broad-except
+        continue
+      results.append((inputs_list, result, example_index))
+  small_value_filter = deepcoder_operations.deepcoder_small_value_filter
+  io_with_example_index_list = [
+      (inputs_list, result if small_value_filter(result) else None,
+       example_index)
+      for inputs_list, result, example_index in results]
   if all(result is None for _, result, _ in io_with_example_index_list):
     # The lambda never ran successfully for any attempted input list for any I/O
     # example. Return None to signal this.
@@ -407,40 +990,60 @@ def is_value_valid(value: value_module.Value) -> bool:
     return False
   if not value.num_free_variables:
     return True
-  if not hasattr(value, 'lambda_exec_results'):
-    value.lambda_exec_results = run_lambda(value)
-  return value.lambda_exec_results is not None
+  return run_lambda(value) is not None
 
 
 def _property_signature_lambda(
     value: value_module.Value,
     output_value: value_module.Value,
-    fixed_length: bool = True) -> List[SignatureTupleType]:
+    fixed_length: bool = True) -> np.ndarray:
   """Returns a property signature for a lambda value."""
-  if not hasattr(value, 'lambda_exec_results'):
-    value.lambda_exec_results = run_lambda(value)
-  io_with_example_index_list = value.lambda_exec_results
+  io_with_example_index_list = run_lambda(value)
   if not io_with_example_index_list:
     # The lambda never ran successfully. We return all padding here, but such a
     # value shouldn't be kept in search.
-    return [_REDUCED_PADDING] * LAMBDA_SIGNATURE_LENGTH
-  signatures_to_reduce = []
-  for inputs, output, example_index in io_with_example_index_list:
-    signatures_to_reduce.append(
-        _type_property(value) +
+    return _FAILED_LAMBDA_SIGNATURE.copy()
+  if not fixed_length:
+    return _reduce_across_examples([
+        list(_type_property(value)) +  # pylint: disable=g-complex-comprehension
         _compare(output, output_value[example_index], fixed_length) +
         _property_signature_single_example(
             inputs, output, fixed_length,
             fixed_num_inputs=FIXED_NUM_LAMBDA_INPUTS,
-            input_types=list(VALUES_TO_TRY),
-            include_input_basic_signatures=False))
-  return _reduce_across_examples(signatures_to_reduce)
+            input_types=_LAMBDA_INPUT_TYPES,
+            include_input_basic_signatures=False)
+        for inputs, output, example_index in io_with_example_index_list])
+  type_property = _type_property(value)
+  prefix_length = _TYPE_PROPERTY_LENGTH + _compare_layout(None)[0]
+  signatures = np.full(
+      (len(io_with_example_index_list),
+       prefix_length + _single_example_length(
+           FIXED_NUM_LAMBDA_INPUTS, _LAMBDA_INPUT_TYPES, False)),
+      -1, dtype=np.int8)
+  signatures[:, :_TYPE_PROPERTY_LENGTH] = type_property
+  # Like property_signature_io_examples(), fill each part for all examples at
+  # once, where the lambda's outputs play the role of the I/O outputs.
+  outputs = [output for _, output, _ in io_with_example_index_list]
+  output_ints = _int_array_or_none(outputs)
+  targets = [output_value[example_index]
+             for _, _, example_index in io_with_example_index_list]
+  _fill_compare_column(signatures, _TYPE_PROPERTY_LENGTH, outputs, output_ints,
+                       targets, _int_array_or_none(targets))
+  offset = _fill_basic_signature_column(signatures, prefix_length, outputs,
+                                        output_ints)
+  for i in range(min(value.num_free_variables, FIXED_NUM_LAMBDA_INPUTS)):
+    inputs = [inputs_list[i]
+              for inputs_list, _, _ in io_with_example_index_list]
+    offset = _fill_compare_column(signatures, offset, inputs,
+                                  _int_array_or_none(inputs), outputs,
+                                  output_ints, x_types=_LAMBDA_INPUT_TYPES)
+  return _reduce_across_examples(signatures)
 
 
 def property_signature_value(
     value: value_module.Value,
     output_value: value_module.Value,
-    fixed_length: bool = True) -> List[SignatureTupleType]:
+    fixed_length: bool = True) -> np.ndarray:
   """Returns a property signature for a Value w.r.t. to the output Value.
 
   Concrete values and lambda values will have signatures of different lengths.
@@ -459,6 +1062,33 @@ _LAMBDA_VALUE = deepcoder_operations.Add().apply(
     free_variables=[value_module.get_free_variable(0)])
 LAMBDA_SIGNATURE_LENGTH = len(property_signature_value(
     _LAMBDA_VALUE, value_module.OutputValue([1]), fixed_length=True))
+# The all-padding signature of a lambda that never ran successfully.
+_FAILED_LAMBDA_SIGNATURE = np.tile(
+    np.array(_REDUCED_PADDING, dtype=np.float32), (LAMBDA_SIGNATURE_LENGTH, 1))
+_FAILED_LAMBDA_SIGNATURE.flags.writeable = False
+
+# Signature fractions are quantized into this many buckets for the model.
+NUM_QUANTIZED_BUCKETS = 12
+
+
+def quantize_signature(signature: np.ndarray) -> np.ndarray:
+  """Quantizes the fractions of a fixed-length signature into uint8 buckets.
+
+  A fraction f goes in bucket 0 if f is (nearly) 0, and floor(10 * f) + 1
+  otherwise, computed in float32. The buckets index embeddings in the model.
+
+  Args:
+    signature: A float array of shape [signature length,
+      SIGNATURE_TUPLE_LENGTH] as returned by property_signature_value() or
+      property_signature_io_examples().
+
+  Returns:
+    A uint8 array of the same shape with values in [0, NUM_QUANTIZED_BUCKETS).
+  """
+  signature = np.asarray(signature, dtype=np.float32)
+  result = np.floor(signature * np.float32(10)).astype(np.uint8) + 1
+  result[signature < np.float32(1e-8)] = 0
+  return result
 
 
 def test():
@@ -15,14 +15,28 @@
 """Tests for lambdabeam.property_signatures.property_signatures."""
 
 import itertools
+from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
+import numpy as np
 
 from lambdabeam.dsl import deepcoder_operations
 from lambdabeam.dsl import value as value_module
 from lambdabeam.property_signatures import property_signatures
 
+_OBJECTS = [True, False, -257, -12, -3, -1, 0, 1, 2, 3, 6, 35, 99, 100, 300,
+            [], [0], [-5], [1, 2, 3], [3, 2, 1], [2, 2, 2], [4, -1, 4, 7],
+            [-200, 17, 0, 3, 3], [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]]
+
+
+def _clear_signature_caches():
+  for cache in (property_signatures._fixed_basic_signature,
+                property_signatures._fixed_compare,
+                property_signatures._cached_list_summary,
+                property_signatures._cached_list_arrays):
+    cache.cache_clear()
+
 
 class CheckerTest(parameterized.TestCase):
 
@@ -113,6 +127,168 @@ class CheckerTest(parameterized.TestCase):
         self.assertLen(signature,
                        property_signatures.IO_EXAMPLES_SIGNATURE_LENGTH)
 
+  def test_fill_basic_properties_of_relevant_matches_reference(self):
+    for x in _OBJECTS:
+      expected = property_signatures._basic_properties_of_relevant(x)
+      out = np.full(len(expected) + 2, -1, dtype=np.int8)
+      property_signatures._fill_basic_properties_of_relevant(x, out, 1)
+      self.assertEqual(out.tolist(), [-1] + [int(b) for b in expected] + [-1],
+                       msg=f'x={x}')
+
+  def test_basic_signature_of_unhandled_type_is_padding(self):
+    signature = property_signatures._basic_signature('ab', fixed_length=True)
+    self.assertEqual(
+        signature.tolist(),
+        [0] * property_signatures._TYPE_PROPERTY_LENGTH +
+        [-1] * (property_signatures._BASIC_SIGNATURE_LENGTH -
+                property_signatures._TYPE_PROPERTY_LENGTH))
+
+  def test_fill_compare_matches_reference(self):
+    for x, y in itertools.product(_OBJECTS, repeat=2):
+      expected = property_signatures._compare(x, y, fixed_length=False)
+      out = np.full(len(expected) + 2, -1, dtype=np.int8)
+      property_signatures._fill_compare(x, y, out, 1)
+      self.assertEqual(out.tolist(), [-1] + [int(b) for b in expected] + [-1],
+                       msg=f'x={x}, y={y}')
+
+  def test_large_ints_match_reference(self):
+    # Too large for the int64 kernels, which fall back to the reference.
+    objects = [2**63, -2**63 - 1, 2**62, [2**63], [10**20, 1],
+               [2**62, -2**62, 2**62], [2**31, -2**31 - 1]]
+    for x in objects:
+      expected = property_signatures._basic_properties_of_relevant(x)
+      out = np.full(len(expected), -1, dtype=np.int8)
+      property_signatures._fill_basic_properties_of_relevant(x, out, 0)
+      self.assertEqual(out.tolist(), [int(b) for b in expected], msg=f'x={x}')
+    for x, y in itertools.product(objects + [0, 5, [1, 2]], repeat=2):
+      expected = property_signatures._compare(x, y, fixed_length=False)
+      out = np.full(len(expected), -1, dtype=np.int8)
+      property_signatures._fill_compare(x, y, out, 0)
+      self.assertEqual(out.tolist(), [int(b) for b in expected],
+                       msg=f'x={x}, y={y}')
+    inputs = [value_module.InputVariable([2**63, 5], name='x1'),
+              value_module.InputVariable([[2**62, -2**62, 2**62], [1]],
+                                         name='x2')]
+    output = value_module.OutputValue([10**20, -3])
+    expected = property_signatures._reduce_across_examples(
+        [property_signatures._property_signature_single_example(
+            [i[example_index] for i in inputs], output[example_index])
+         for example_index in range(2)])
+    np.testing.assert_array_equal(
+        property_signatures.property_signature_io_examples(inputs, output),
+        expected)
+
+  def test_property_signature_io_examples_matches_single_examples(self):
+    inputs = [value_module.InputVariable([3, -8, 0], name='x1'),
+              value_module.InputVariable([[1, 5], [], [-2]], name='x2'),
+              value_module.InputVariable([True, 7, 2], name='x3')]
+    output = value_module.OutputValue([9, 4, -30])
+    expected = property_signatures._reduce_across_examples(
+        [property_signatures._property_signature_single_example(
+            [i[example_index] for i in inputs], output[example_index])
+         for example_index in range(3)])
+    np.testing.assert_array_equal(
+        property_signatures.property_signature_io_examples(inputs, output),
+        expected)
+
+  @parameterized.named_parameters(
+      ('int_output', deepcoder_operations.Add, [3, -8], [1, 2]),
+      ('bool_output', deepcoder_operations.Greater, [3, -8], [True, False]),
+      ('list_target', deepcoder_operations.Multiply, [2, 50], [[1], [2, 3]]))
+  def test_property_signature_lambda_matches_single_examples(
+      self, operation_class, constants, outputs):
+    v1 = value_module.get_free_variable(0)
+    value = operation_class().apply(
+        [v1, value_module.InputVariable(constants, name='x')],
+        free_variables=[v1])
+    output_value = value_module.OutputValue(outputs)
+    expected = property_signatures._reduce_across_examples(
+        [np.concatenate([  # pylint: disable=g-complex-comprehension
+            property_signatures._type_property(value),
+            property_signatures._compare(output, output_value[example_index],
+                                         fixed_length=True),
+            property_signatures._property_signature_single_example(
+                inputs, output,
+                fixed_num_inputs=property_signatures.FIXED_NUM_LAMBDA_INPUTS,
+                input_types=property_signatures._LAMBDA_INPUT_TYPES,
+                include_input_basic_signatures=False)])
+         for inputs, output, example_index
+         in property_signatures.run_lambda(value)])
+    np.testing.assert_array_equal(
+        property_signatures.property_signature_value(value, output_value),
+        expected)
+
+  def test_property_signature_value_of_constant(self):
+    # A constant has a single value, which is used for every example.
+    output = value_module.OutputValue([9, [4], -30])
+    expected = property_signatures._reduce_across_examples(
+        [property_signatures._property_signature_single_object(7, o)
+         for o in [9, [4], -30]])
+    np.testing.assert_array_equal(
+        property_signatures.property_signature_value(
+            value_module.ConstantValue(7), output),
+        expected)
+
+  @parameterized.parameters(True, False)
+  def test_mismatched_num_examples_raises(self, fixed_length):
+    output = value_module.OutputValue([3, 4, 5])
+    with self.assertRaises(AssertionError):
+      property_signatures.property_signature_value(
+          value_module.InputVariable([1, 2], name='x'), output,
+          fixed_length=fixed_length)
+    with self.assertRaises(AssertionError):
+      property_signatures.property_signature_io_examples(
+          [value_module.InputVariable([1, 2], name='x')], output,
+          fixed_length=fixed_length)
+
+  def test_signatures_without_kernels_match_reference(self):
+    v1 = value_module.get_free_variable(0)
+    x1 = value_module.InputVariable([3, -8, 100], name='x1')
+    x2 = value_module.InputVariable([[1, 5], [], [-2, 7, 7]], name='x2')
+    outputs = [value_module.OutputValue([9, 4, -30]),
+               value_module.OutputValue([[4, 4], [], [0, -1]])]
+    values = [x1, x2, value_module.ConstantValue(7),
+              deepcoder_operations.Add().apply([v1, x1], free_variables=[v1]),
+              deepcoder_operations.Take().apply([x1, x2])]
+
+    def signatures():
+      result = []
+      for output in outputs:
+        for fixed_length in (True, False):
+          result.append(property_signatures.property_signature_io_examples(
+              [x1, x2], output, fixed_length=fixed_length))
+        result.extend(property_signatures.property_signature_value(v, output)
+                      for v in values)
+      return result
+
+    expected = signatures()
+    # Signatures cached while the kernels were enabled must not be reused.
+    _clear_signature_caches()
+    self.addCleanup(_clear_signature_caches)
+    self.enter_context(
+        mock.patch.object(property_signatures, '_KERNELS_ENABLED', False))
+    self.enter_context(mock.patch.dict(
+        property_signatures._BASIC_PROPERTIES_KERNEL_BY_TYPE, clear=True))
+    self.enter_context(mock.patch.dict(
+        property_signatures._COMPARE_KERNEL_BY_TYPES, clear=True))
+    for signature, expected_signature in zip(signatures(), expected):
+      np.testing.assert_array_equal(signature, expected_signature)
+
+  def test_reduce_across_examples(self):
+    signature = property_signatures._reduce_across_examples(
+        [[True, -1, False, -1],
+         [True, -1, True, False]])
+    self.assertEqual(signature.dtype, np.float32)
+    np.testing.assert_array_equal(
+        signature, [[1.0, 1.0], [0.0, 0.5], [1.0, 0.5], [0.5, 0.0]])
+
+  def test_quantize_signature(self):
+    signature = np.array([[0.0, 0.5], [1.0, 0.05], [1 / 3, 0.1]],
+                         dtype=np.float32)
+    quantized = property_signatures.quantize_signature(signature)
+    self.assertEqual(quantized.dtype, np.uint8)
+    np.testing.assert_array_equal(quantized, [[0, 6], [11, 1], [4, 2]])
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -36,5 +36,10 @@ setup(name='lambdabeam',
         'torch',
         'torch_scatter',
         'setuptools==59.5.0',
-      ]
+      ],
+      extras_require={
+        # Compiles the property signature kernels; otherwise the pure Python
+        # reference implementation is used.
+        'numba': ['numba'],
+      }
 )